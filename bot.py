@@ -1,11 +1,13 @@
 import os
+import re
 import asyncio
 import logging
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.error import BadRequest
+from telegram.error import BadRequest, NetworkError, RetryAfter, TimedOut
 from telegram.ext import (
     Application,
+    BaseUpdateProcessor,
     CommandHandler,
     CallbackQueryHandler,
     ConversationHandler,
@@ -13,11 +15,13 @@ from telegram.ext import (
     filters,
     ContextTypes,
 )
-from storage import Storage
-from monitor import AttendanceMonitor
 
+# Load .env before importing local modules: monitor.py reads its pool and debug settings at import.
 load_dotenv()
 
+from storage import Storage
+from monitor import AttendanceMonitor, prewarm_driver_pool
+
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     level=logging.INFO,
@@ -58,6 +62,13 @@ EFFECTIVE_MAX_ACTIVE_MONITORS = 1 if SINGLE_USER_MODE else max(1, MAX_ACTIVE_MON
 
 storage = Storage()
 monitors: dict[int, AttendanceMonitor] = {}  # telegram_id -> AttendanceMonitor
+# Per-user start/stop serialization so two quick presses can't double-start. Per user rather
+# than global: stop() joins the monitor thread for up to 10 s and must not hold up other users.
+_monitor_locks: dict[int, asyncio.Lock] = {}
+_dead_monitors: asyncio.Queue = asyncio.Queue()  # (telegram_id, monitor) reported by dying monitor threads
+
+# Invitation codes are 8 uppercase letters/digits (see Storage.create_invitation)
+_CODE_RE = re.compile(r"^[A-Z0-9]{8}$")
 
 # Conversation states
 AWAITING_CODE = 1
@@ -152,7 +163,17 @@ def _schedule_single_user_autostart(job_queue, delay_seconds: int):
     )
 
 
-def _start_monitor_for_user(telegram_id: int, student: dict, app: Application) -> tuple[bool, str]:
+def _monitor_lock(telegram_id: int) -> asyncio.Lock:
+    return _monitor_locks.setdefault(telegram_id, asyncio.Lock())
+
+
+async def _start_monitor_for_user(telegram_id: int, student: dict, app: Application) -> tuple[bool, str]:
+    # _start_monitor_locked never awaits, so the capacity check and insert are atomic on the loop.
+    async with _monitor_lock(telegram_id):
+        return _start_monitor_locked(telegram_id, student, app)
+
+
+def _start_monitor_locked(telegram_id: int, student: dict, app: Application) -> tuple[bool, str]:
     existing = monitors.get(telegram_id)
     if existing and existing.is_running():
         return False, "already_running"
@@ -164,13 +185,14 @@ def _start_monitor_for_user(telegram_id: int, student: dict, app: Application) -
         return False, f"capacity:{active}/{EFFECTIVE_MAX_ACTIVE_MONITORS}"
 
     try:
-        on_found, on_status = make_attendance_callback(telegram_id, app)
+        on_found, on_status, on_death = make_attendance_callback(telegram_id, app)
         monitor = AttendanceMonitor(
             username=student["username"],
             password=student["password"],
             mode=student.get("mode", "automatic"),
             on_attendance_found=on_found,
             on_status_update=on_status,
+            on_death=on_death,
         )
         monitors[telegram_id] = monitor
         monitor.start()
@@ -183,16 +205,42 @@ def _start_monitor_for_user(telegram_id: int, student: dict, app: Application) -
         return False, f"exception:{type(e).__name__}"
 
 
-def _stop_monitor_for_user(telegram_id: int):
-    monitor = monitors.pop(telegram_id, None)
-    if monitor:
-        monitor.stop()
+async def _stop_monitor_for_user(telegram_id: int):
+    async with _monitor_lock(telegram_id):
+        monitor = monitors.pop(telegram_id, None)
+        if monitor:
+            # stop() joins the monitor thread; keep the event loop serving other users meanwhile.
+            await asyncio.to_thread(monitor.stop)
     if not SINGLE_USER_MODE:
         storage.update_student(telegram_id, monitoring=False)
 
 
 # Attendance callbacks (called from monitor threads)
 
+async def _send_with_retry(bot, attempts: int = 5, **kwargs):
+    """send_message that backs off on flood control (429) and transient network errors."""
+    delay = 0.5
+    for attempt in range(1, attempts + 1):
+        try:
+            return await bot.send_message(**kwargs)
+        except RetryAfter as e:
+            wait = e.retry_after
+        except BadRequest:
+            raise
+        except TimedOut:
+            # The request may well have been delivered; resending could post the message twice.
+            logger.warning("Message to %s timed out; not retrying", kwargs.get("chat_id"))
+            return None
+        except NetworkError:
+            wait = delay
+            delay *= 2
+        if attempt == attempts:
+            break
+        await asyncio.sleep(wait)
+    logger.warning("Giving up on message to %s after %d attempts", kwargs.get("chat_id"), attempts)
+    return None
+
+
 def make_attendance_callback(telegram_id: int, app: Application):
     """Create callback closures for a specific user's monitor."""
     loop = asyncio.get_running_loop()
@@ -200,19 +248,110 @@ def make_attendance_callback(telegram_id: int, app: Application):
     def on_attendance_found(username: str, status: str):
         if status == "marked":
             msg = f"[{username}] Attendance Marked."
-            coro = app.bot.send_message(chat_id=telegram_id, text=msg)
+            coro = _send_with_retry(app.bot, chat_id=telegram_id, text=msg)
         else:
             msg = f"[{username}] Attendance available! Press the button to mark."
             keyboard = InlineKeyboardMarkup([
                 [InlineKeyboardButton("Mark Now", callback_data="mark_now")]
             ])
-            coro = app.bot.send_message(chat_id=telegram_id, text=msg, reply_markup=keyboard)
+            coro = _send_with_retry(app.bot, chat_id=telegram_id, text=msg, reply_markup=keyboard)
         asyncio.run_coroutine_threadsafe(coro, loop)
 
     def on_status_update(username: str, message: str):
         logger.info(message)
 
-    return on_attendance_found, on_status_update
+    def on_death(monitor: AttendanceMonitor):
+        loop.call_soon_threadsafe(_dead_monitors.put_nowait, (telegram_id, monitor))
+
+    return on_attendance_found, on_status_update, on_death
+
+
+async def _watchdog(app: Application):
+    """Clean up monitors whose thread died; woken by on_death instead of polling."""
+    while True:
+        tid, monitor = await _dead_monitors.get()
+        async with _monitor_lock(tid):
+            if monitors.get(tid) is not monitor:
+                continue  # stopped by the user, or already replaced by a fresh monitor
+            monitors.pop(tid, None)
+            try:
+                # on_death fires from the exiting thread; stop() joins it.
+                await asyncio.to_thread(monitor.stop)
+            except Exception:
+                pass
+
+        username = str(tid)
+        student = get_student(tid) if SINGLE_USER_MODE else storage.get_student(tid)
+        if student:
+            username = student["username"]
+        if not SINGLE_USER_MODE:
+            storage.update_student(tid, monitoring=False)
+
+        logger.warning("[%s] Monitor thread died - cleaning up", username)
+        try:
+            kwargs = {}
+            if student:
+                kwargs["reply_markup"] = get_main_menu(student)
+            await _send_with_retry(
+                app.bot,
+                chat_id=tid,
+                text=f"[{username}] Monitor crashed and stopped. Press Start Monitoring to restart.",
+                **kwargs,
+            )
+        except Exception:
+            pass
+
+
+async def _post_init(app: Application):
+    # post_init runs before Application.start(), where app.create_task would leave the task
+    # unawaited; keep the handle so _post_shutdown can cancel it.
+    app.bot_data["watchdog"] = asyncio.create_task(_watchdog(app))
+
+
+async def _post_shutdown(app: Application):
+    task = app.bot_data.pop("watchdog", None)
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+class _PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles updates from different users concurrently, one user's updates in order.
+
+    PTB's default processor runs every update sequentially, so one user's Stop (which
+    joins the monitor thread) would hold up everyone else's buttons. Keeping each user
+    serialized preserves the ConversationHandler's per-user state transitions.
+
+    The per-user lock is taken before the shared concurrency permit, so updates queued
+    behind their own user's slow Stop wait without holding permits other users need.
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._user_locks: dict[int, asyncio.Lock] = {}
+
+    async def process_update(self, update: object, coroutine) -> None:
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            await super().process_update(update, coroutine)
+            return
+        lock = self._user_locks.setdefault(user.id, asyncio.Lock())
+        async with lock:
+            await super().process_update(update, coroutine)
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
 
 
 async def _single_user_autostart_job(context: ContextTypes.DEFAULT_TYPE):
@@ -231,7 +370,7 @@ async def _single_user_autostart_job(context: ContextTypes.DEFAULT_TYPE):
         logger.error("Single-user autostart aborted: student context is unavailable.")
         return
 
-    started, reason = _start_monitor_for_user(
+    started, reason = await _start_monitor_for_user(
         telegram_id=SINGLE_USER_TELEGRAM_ID,
         student=student,
         app=context.application,
@@ -320,8 +459,8 @@ async def enter_code_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.edit_message_text("Registration is disabled in single-user mode.")
         return ConversationHandler.END
 
-    if storage.get_student(query.from_user.id):
-        student = storage.get_student(query.from_user.id)
+    student = storage.get_student(query.from_user.id)
+    if student:
         await query.edit_message_text(
             f"[{student['username']}] You are already registered!",
             reply_markup=get_main_menu(student),
@@ -338,6 +477,9 @@ async def receive_code(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return ConversationHandler.END
 
     code = update.message.text.strip().upper()
+    if not _CODE_RE.match(code):
+        await update.message.reply_text("Invalid invitation code. Please try again or contact admin.")
+        return AWAITING_CODE
 
     invitation = storage.get_invitation(code)
     if not invitation:
@@ -450,7 +592,7 @@ async def _handle_button(query, telegram_id, data, context):
             single_user_autostart_attempts = 0
             _cancel_single_user_autostart_jobs(context.application.job_queue)
 
-        started, reason = _start_monitor_for_user(telegram_id, student, context.application)
+        started, reason = await _start_monitor_for_user(telegram_id, student, context.application)
         username = student["username"]
         if not started and reason == "already_running":
             await query.edit_message_text(
@@ -473,10 +615,9 @@ async def _handle_button(query, telegram_id, data, context):
             )
             return
 
-        refreshed = get_student(telegram_id) or student
         await query.edit_message_text(
-            f"[{username}] Monitoring started. Mode: {refreshed.get('mode', 'automatic')}.",
-            reply_markup=get_main_menu(refreshed),
+            f"[{username}] Monitoring started. Mode: {student.get('mode', 'automatic')}.",
+            reply_markup=get_main_menu(student),
         )
 
     elif data == "stop":
@@ -486,9 +627,8 @@ async def _handle_button(query, telegram_id, data, context):
             _cancel_single_user_autostart_jobs(context.application.job_queue)
 
         username = student["username"] if student else str(telegram_id)
-        _stop_monitor_for_user(telegram_id)
-        refreshed = get_student(telegram_id)
-        reply_markup = get_main_menu(refreshed) if refreshed else None
+        await _stop_monitor_for_user(telegram_id)
+        reply_markup = get_main_menu(student) if student else None
         await query.edit_message_text(
             f"[{username}] Monitoring stopped.",
             reply_markup=reply_markup,
@@ -507,7 +647,7 @@ async def _handle_button(query, telegram_id, data, context):
         if telegram_id in monitors:
             monitors[telegram_id].set_mode(new_mode)
 
-        refreshed = get_student(telegram_id) or student
+        refreshed = {**student, "mode": new_mode}
         await query.edit_message_text(
             f"[{username}] Mode switched to {new_mode}.",
             reply_markup=get_main_menu(refreshed),
@@ -522,12 +662,11 @@ async def _handle_button(query, telegram_id, data, context):
         running = telegram_id in monitors and monitors[telegram_id].is_running()
         status_text = "active" if running else "inactive"
 
-        refreshed = get_student(telegram_id) or student
         await query.edit_message_text(
             f"[{username}] Status\n"
             f"Mode: {mode}\n"
             f"Monitoring: {status_text}",
-            reply_markup=get_main_menu(refreshed),
+            reply_markup=get_main_menu(student),
         )
 
     elif data == "mark_now":
@@ -538,7 +677,7 @@ async def _handle_button(query, telegram_id, data, context):
         if telegram_id not in monitors:
             await query.edit_message_text(f"[{username}] Monitor is not running.")
             return
-        success = monitors[telegram_id].mark_now()
+        success = await asyncio.to_thread(monitors[telegram_id].mark_now)
         if success:
             await query.edit_message_text(f"[{username}] Attendance Marked.")
         else:
@@ -572,10 +711,10 @@ async def _handle_button(query, telegram_id, data, context):
             await query.edit_message_text("No registered students.", reply_markup=get_admin_menu())
             return
 
+        running = {tid for tid, mon in monitors.items() if mon.is_running()}
         lines = []
         for tid, s in students.items():
-            running = int(tid) in monitors and monitors[int(tid)].is_running()
-            status = "ACTIVE" if running else "inactive"
+            status = "ACTIVE" if int(tid) in running else "inactive"
             lines.append(f"- {s['username']} | {s['mode']} | {status}")
 
         await query.edit_message_text(
@@ -587,10 +726,11 @@ async def _handle_button(query, telegram_id, data, context):
         if not is_admin(telegram_id):
             await query.edit_message_text("Access denied.")
             return
+        students = storage.get_all_students()
         active = []
         for tid, mon in monitors.items():
             if mon.is_running():
-                s = storage.get_student(tid)
+                s = students.get(str(tid))
                 if s:
                     active.append(f"- {s['username']} | {s['mode']}")
         if not active:
@@ -641,7 +781,14 @@ def main():
                 storage.update_student(int(tid), monitoring=False)
                 logger.info("[%s] Reset stale monitoring flag", s["username"])
 
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    app = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(_PerUserUpdateProcessor(max_concurrent_updates=64))
+        .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
+        .build()
+    )
 
     if SINGLE_USER_MODE:
         app.add_handler(CommandHandler("start", start_command))
@@ -665,41 +812,6 @@ def main():
 
     app.add_handler(CallbackQueryHandler(button_callback))
 
-    async def watchdog(context: ContextTypes.DEFAULT_TYPE):
-        dead = []
-        for tid, mon in list(monitors.items()):
-            if not mon.is_running():
-                dead.append(tid)
-        for tid in dead:
-            monitor = monitors.pop(tid, None)
-            if monitor:
-                try:
-                    monitor.stop()
-                except Exception:
-                    pass
-
-            username = str(tid)
-            student = get_student(tid) if SINGLE_USER_MODE else storage.get_student(tid)
-            if student:
-                username = student["username"]
-            if not SINGLE_USER_MODE:
-                storage.update_student(tid, monitoring=False)
-
-            logger.warning("[%s] Monitor thread died - cleaning up", username)
-            try:
-                kwargs = {}
-                if student:
-                    kwargs["reply_markup"] = get_main_menu(student)
-                await context.bot.send_message(
-                    chat_id=tid,
-                    text=f"[{username}] Monitor crashed and stopped. Press Start Monitoring to restart.",
-                    **kwargs,
-                )
-            except Exception:
-                pass
-
-    app.job_queue.run_repeating(watchdog, interval=60, first=30)
-
     if SINGLE_USER_MODE and SINGLE_USER_AUTOSTART:
         if single_user_config_error() is None:
             _schedule_single_user_autostart(app.job_queue, delay_seconds=2)
@@ -707,6 +819,8 @@ def main():
         else:
             logger.error("Single-user autostart skipped due to configuration errors.")
 
+    prewarm_driver_pool()
+
     logger.info("Bot started. Polling...")
     app.run_polling(allowed_updates=Update.ALL_TYPES)
 
@@ -0,0 +1,212 @@
+import os
+import shutil
+import signal
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def kill_profile_processes(tag):
+    """SIGKILL every process whose command line mentions ``tag``. Returns the number killed."""
+    if os.name != "posix":
+        return 0
+    proc_dir = "/proc"
+    if not os.path.isdir(proc_dir):
+        return 0
+
+    killed = 0
+    me = os.getpid()
+    for name in os.listdir(proc_dir):
+        if not name.isdigit():
+            continue
+        pid = int(name)
+        if pid == me:
+            continue
+        cmdline_path = os.path.join(proc_dir, name, "cmdline")
+        try:
+            with open(cmdline_path, "rb") as f:
+                raw = f.read()
+        except Exception:
+            continue
+        if not raw:
+            continue
+        cmd = raw.replace(b"\x00", b" ").decode("utf-8", errors="ignore")
+        if tag not in cmd:
+            continue
+
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed += 1
+        except ProcessLookupError:
+            pass
+        except PermissionError:
+            pass
+        except Exception:
+            pass
+    return killed
+
+
+class DriverSlot:
+    """
+    One seat in the pool: a Chrome profile directory, its chromedriver log,
+    and the driver currently running on that profile (if any).
+
+    The profile is wiped on every launch; the disk cache lives outside it and
+    survives relaunches, so static Vaadin assets stay warm.
+    """
+
+    def __init__(self, index):
+        tmp_dir = tempfile.gettempdir()
+        self.index = index
+        # Zero-padded so that one slot's tag is never a substring of another's.
+        self.tag = f"kbtu-chrome-profile-pool{index:03d}"
+        self.profile_dir = os.path.join(tmp_dir, self.tag)
+        self.cache_dir = os.path.join(tmp_dir, f"kbtu-chrome-cache-pool{index:03d}")
+        self.log_path = os.path.join(tmp_dir, f"kbtu-chromedriver-pool{index:03d}.log")
+        self.driver = None
+        self.checkouts = 0  # checkouts served by the current driver
+
+
+class DriverPool:
+    """
+    Bounded pool of Chrome drivers shared by all monitor threads.
+
+    A monitor checks out a slot for the lifetime of its browser session and
+    hands it back when it stops, so the next monitor reuses the warm Chrome
+    instead of paying a cold start. Cookies are cleared on release, so a
+    reused driver never carries one account's session into another's.
+
+    launcher(slot) must start Chrome on slot.profile_dir and return the driver.
+    A driver is quit instead of reused once it has served recycle_after
+    checkouts (0 disables), capping Chrome's native memory drift.
+    """
+
+    def __init__(self, launcher, max_drivers, max_idle=1, recycle_after=0):
+        self._launcher = launcher
+        self._max_idle = max(0, max_idle)
+        self._recycle_after = max(0, recycle_after)
+        self._cond = threading.Condition()
+        self._free = [DriverSlot(i) for i in reversed(range(max(1, max_drivers)))]
+        self._idle = []
+        self._prewarming = 0  # prewarm launches in flight; each will land in _idle
+
+    def acquire(self, launcher=None, stop_event=None):
+        """
+        Return a slot holding a live driver, reusing an idle one when possible.
+        Blocks while every slot is checked out, or while a prewarm launch is still in
+        flight (rather than starting a second Chrome next to it); returns None if
+        stop_event is set meanwhile.
+        """
+        with self._cond:
+            while not self._idle and (self._prewarming or not self._free):
+                if stop_event is not None and stop_event.is_set():
+                    return None
+                self._cond.wait(timeout=1)
+            if self._idle:
+                slot = self._idle.pop()
+                slot.checkouts += 1
+                return slot
+            slot = self._free.pop()
+
+        try:
+            self._reset_slot(slot)
+            slot.driver = (launcher or self._launcher)(slot)
+        except Exception:
+            self.discard(slot)
+            raise
+        slot.checkouts = 1
+        return slot
+
+    def prewarm(self, count, launcher=None):
+        """
+        Launch up to ``count`` drivers into the idle list on a background thread,
+        so the first monitors after boot skip the cold start. Capped at max_idle.
+        """
+        count = min(max(0, count), self._max_idle)
+        if not count:
+            return None
+        thread = threading.Thread(
+            target=self._prewarm, args=(count, launcher or self._launcher), name="driver-pool-prewarm", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def release(self, slot):
+        """Hand a slot back. Drivers that fail to reset, or exceed the idle cap, are quit."""
+        driver = slot.driver
+        if driver is None or (self._recycle_after and slot.checkouts >= self._recycle_after):
+            self.discard(slot)
+            return
+        try:
+            # Unload the previous account's page first: an in-flight UIDL or heartbeat
+            # response could otherwise write cookies back after the jar was cleared.
+            driver.get("about:blank")
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        except Exception:
+            self.discard(slot)
+            return
+
+        with self._cond:
+            if len(self._idle) < self._max_idle:
+                self._idle.append(slot)
+                self._cond.notify()
+                return
+        self.discard(slot)
+
+    def discard(self, slot):
+        """Quit the slot's driver, clean up its profile, and free the seat."""
+        driver, slot.driver = slot.driver, None
+        slot.checkouts = 0
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        killed = kill_profile_processes(slot.tag)
+        if killed:
+            logger.info("Cleaned stale Chromium processes for %s: %d", slot.tag, killed)
+        shutil.rmtree(slot.profile_dir, ignore_errors=True)
+
+        with self._cond:
+            self._free.append(slot)
+            self._cond.notify()
+
+    def _prewarm(self, count, launcher):
+        for _ in range(count):
+            with self._cond:
+                if len(self._idle) >= self._max_idle or not self._free:
+                    return
+                slot = self._free.pop()
+                self._prewarming += 1
+            try:
+                try:
+                    self._reset_slot(slot)
+                    slot.driver = launcher(slot)
+                except Exception as e:
+                    logger.warning("Pool prewarm failed for %s: %s", slot.tag, e)
+                    self.discard(slot)
+                    return
+                slot.checkouts = 0
+                with self._cond:
+                    if len(self._idle) < self._max_idle:
+                        self._idle.append(slot)
+                        logger.info("Prewarmed Chrome in %s", slot.tag)
+                        continue
+                self.discard(slot)
+            finally:
+                # Wake every waiter: they either take the new idle driver or fall back to a free slot.
+                with self._cond:
+                    self._prewarming -= 1
+                    self._cond.notify_all()
+
+    def _reset_slot(self, slot):
+        killed = kill_profile_processes(slot.tag)
+        if killed:
+            logger.info("Cleaned stale Chromium processes for %s: %d", slot.tag, killed)
+        try:
+            shutil.rmtree(slot.profile_dir, ignore_errors=True)
+            os.makedirs(slot.profile_dir, exist_ok=True)
+        except Exception:
+            pass
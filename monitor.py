@@ -1,20 +1,93 @@
 import os
 import time
+import random
+import logging
 import threading
-import hashlib
-import shutil
-import tempfile
-import signal
 from selenium import webdriver
-from selenium.common.exceptions import SessionNotCreatedException
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
+from selenium.webdriver.common.driver_finder import DriverFinder
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from browser_pool import DriverPool
 
 LOGIN_URL = "https://wsp.kbtu.kz/RegistrationOnline"
 REFRESH_INTERVAL = 30 # seconds
+BUTTON_WATCH_WINDOW = 3  # seconds after a load during which the observer flag is polled for a late render
+BUTTON_WATCH_POLL = 0.5  # seconds between flag polls inside that window
+REFRESH_JITTER = 3  # seconds either way, so monitors started together drift apart instead of reloading in lockstep
+
+# Locators, built once and shared by every monitor.
+LOC_USERNAME = (By.XPATH, "//input[contains(@class, 'v-filterselect-input')]")
+LOC_USERNAME_SUGGESTIONS = (By.XPATH, "//div[contains(@class, 'v-filterselect-suggestpopup')]")
+LOC_PASSWORD = (By.XPATH, "//input[@type='password']")
+LOC_LOGIN_BTN = (By.XPATH, "//div[contains(@class, 'v-button') and contains(@class, 'primary')]")
+LOC_NOTIFICATION = (By.XPATH, "//div[contains(@class, 'v-Notification')]")
+LOC_PAGE_ERRORS = (By.XPATH,
+    "//*[contains(@class, 'error') or contains(@class, 'v-Notification') or contains(@class, 'warning')]")
+LOC_CAPTIONS = (By.XPATH, "//span[@class='v-button-caption']")
+
+# Button captions plus password-field presence in one round trip; reused for the
+# session check and the debug dumps instead of traversing the DOM once for each.
+PAGE_SNAPSHOT_JS = (
+    "return {"
+    "captions: Array.from(document.querySelectorAll('span.v-button-caption'))"
+    ".map(e => e.textContent.trim()).filter(t => t),"
+    "password: !!document.querySelector('input[type=password]')"
+    "};"
+)
+# Installs (once per page load) a MutationObserver that raises window.__attBtnReady as soon as
+# an "Отметиться" caption is rendered, and returns the flag. Catches a button that renders just
+# after the captions do, without polling the DOM through WebDriver.
+BUTTON_WATCH_JS = (
+    "const caption = arguments[0];"
+    "if (!window.__attObserver) {"
+    "window.__attBtnReady = false;"
+    "const check = () => {"
+    "for (const e of document.querySelectorAll('span.v-button-caption')) {"
+    "if (e.textContent.trim() === caption) { window.__attBtnReady = true; return; }"
+    "}"
+    "};"
+    "window.__attObserver = new MutationObserver(check);"
+    "window.__attObserver.observe(document.body, {childList: true, subtree: true, characterData: true});"
+    "check();"
+    "}"
+    "return window.__attBtnReady === true;"
+)
+BUTTON_FLAG_JS = "return window.__attBtnReady === true;"
+# The enabled button wrapping the caption, or null; one round trip instead of the
+# find + is_displayed + is_enabled polling behind EC.element_to_be_clickable.
+ENABLED_BUTTON_JS = (
+    "const caption = arguments[0];"
+    "for (const s of document.querySelectorAll('span.v-button-caption')) {"
+    "if (s.textContent.trim() !== caption) continue;"
+    "const b = s.closest('.v-button');"
+    "if (b && !b.classList.contains('v-disabled') && b.offsetParent !== null) return b;"
+    "}"
+    "return null;"
+)
+OTMETITSYA_CAPTION = "\u041e\u0442\u043c\u0435\u0442\u0438\u0442\u044c\u0441\u044f"
+# Assets the monitor never looks at; blocked via CDP so each refresh only pulls the Vaadin app itself.
+# Stylesheets stay allowed: Vaadin measures the themed DOM to lay out the view, and without
+# the theme the buttons can render zero-sized and fail the clickable checks.
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.ico", "*.svg", "*.webp", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics*", "*googletagmanager*",
+]
+LOGIN_CAPTIONS = frozenset({"\u041a\u0456\u0440\u0443", "\u0412\u043e\u0439\u0442\u0438", "Login"})
+
+_chromedriver_paths = None  # (driver_path, browser_path), resolved once per process
+_chromedriver_paths_lock = threading.Lock()
+
+
+def _env_bool(name, default=False):
+    raw = os.environ.get(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
 
 
 def _env_int(name, default):
@@ -24,10 +97,187 @@ def _env_int(name, default):
         return default
 
 
+logger = logging.getLogger(__name__)
+if _env_bool("MONITOR_DEBUG", False):
+    # Page diagnostics (screenshots, page text, button dumps) only run at DEBUG level.
+    logger.setLevel(logging.DEBUG)
+
+
+# Bounds how many Chrome processes start at once, so a burst of monitor starts
+# queues up here instead of spiking PIDs and CPU all at the same moment.
+_LAUNCH_SEM = threading.Semaphore(max(1, _env_int("CHROME_LAUNCH_CONCURRENCY", 2)))
+
+
+def _pick_chrome_binary():
+    configured = os.environ.get("CHROME_BIN")
+    if configured and os.path.exists(configured):
+        return configured
+
+    # Prefer the real Chromium binary over the wrapper script in constrained containers.
+    candidates = (
+        "/usr/lib/chromium/chromium",
+        "/usr/bin/chromium",
+        "/usr/bin/chromium-browser",
+        "/usr/bin/google-chrome",
+    )
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _read_cgroup_pid_stats():
+    # cgroup v2 first, then v1 fallback
+    candidates = (
+        ("/sys/fs/cgroup/pids.current", "/sys/fs/cgroup/pids.max"),
+        ("/sys/fs/cgroup/pids/pids.current", "/sys/fs/cgroup/pids/pids.max"),
+    )
+    for current_path, max_path in candidates:
+        try:
+            with open(current_path, "r", encoding="utf-8") as f:
+                current_raw = f.read().strip()
+            with open(max_path, "r", encoding="utf-8") as f:
+                max_raw = f.read().strip()
+        except Exception:
+            continue
+
+        try:
+            current = int(current_raw)
+        except Exception:
+            continue
+
+        if max_raw == "max":
+            return current, None
+        try:
+            return current, int(max_raw)
+        except Exception:
+            return current, None
+    return None
+
+
+def _resolve_chromedriver_paths(options):
+    # Service() without a path makes Selenium Manager run a subprocess (and possibly
+    # hit the network) on every launch; resolve once and reuse it for every driver.
+    global _chromedriver_paths
+    if _chromedriver_paths is None:
+        # Monitors start concurrently; only the first one pays for the lookup.
+        with _chromedriver_paths_lock:
+            if _chromedriver_paths is None:
+                configured = os.environ.get("CHROMEDRIVER_PATH")
+                if configured:
+                    _chromedriver_paths = (configured, "")
+                else:
+                    finder = DriverFinder(Service(), options)
+                    _chromedriver_paths = (finder.get_driver_path(), finder.get_browser_path())
+    return _chromedriver_paths
+
+
+def _create_driver(slot):
+    options = Options()
+    options.add_argument("--ignore-certificate-errors")
+
+    headless_mode = os.environ.get("CHROME_HEADLESS_MODE", "new").strip().lower()
+    if headless_mode in ("legacy", "old", "classic"):
+        options.add_argument("--headless")
+    else:
+        options.add_argument("--headless=new")
+
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-background-networking")
+    options.add_argument("--disable-default-apps")
+    options.add_argument("--disable-sync")
+    options.add_argument("--disable-translate")
+    options.add_argument("--disable-breakpad")
+    options.add_argument("--disable-crash-reporter")
+    options.add_argument("--disable-features=Crashpad")
+    options.add_argument("--disable-background-timer-throttling")
+    options.add_argument("--disable-renderer-backgrounding")
+    options.add_argument("--disable-backgrounding-occluded-windows")
+    options.add_argument("--renderer-process-limit=1")
+    options.add_argument("--no-zygote")
+    pid_stats = _read_cgroup_pid_stats()
+    if pid_stats and pid_stats[1] and pid_stats[1] <= 1500:
+        # Low PID ceilings benefit from single-process mode.
+        options.add_argument("--single-process")
+    options.add_argument("--no-first-run")
+    options.add_argument("--window-size=1280,800")
+    options.add_argument("--remote-debugging-pipe")
+    options.add_argument(f"--user-data-dir={slot.profile_dir}")
+    options.add_argument(f"--disk-cache-dir={slot.cache_dir}")
+    options.add_argument(f"--disk-cache-size={100 * 1024 * 1024}")
+    # Back-stop for the CDP block list: images stay off even if Network.setBlockedURLs fails.
+    options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    # Use a known local browser binary path; avoid wrapper scripts when possible.
+    chrome_bin = _pick_chrome_binary()
+    if chrome_bin:
+        options.binary_location = chrome_bin
+
+    extra_args = os.environ.get("CHROME_EXTRA_ARGS", "").strip()
+    if extra_args:
+        for arg in extra_args.split():
+            options.add_argument(arg)
+
+    chromedriver_path, browser_path = _resolve_chromedriver_paths(options)
+    if browser_path and not options.binary_location:
+        options.binary_location = browser_path
+
+    service_args = ["--verbose", f"--log-path={slot.log_path}"]
+    with _LAUNCH_SEM:
+        driver = webdriver.Chrome(
+            service=Service(chromedriver_path, service_args=service_args),
+            options=options,
+        )
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    except Exception:
+        pass  # blocking is an optimization only
+    return driver
+
+
+_DRIVER_POOL = DriverPool(
+    _create_driver,
+    max_drivers=_env_int("CHROME_POOL_MAX", 30),
+    max_idle=_env_int("CHROME_POOL_MAX_IDLE", 1),
+    recycle_after=_env_int("CHROME_POOL_RECYCLE_AFTER", 100),
+)
+
+
+def _pid_min_free():
+    return max(5, _env_int("CHROME_PID_MIN_FREE", 20))
+
+
+def _has_pid_headroom(min_free):
+    stats = _read_cgroup_pid_stats()
+    if not stats:
+        return True
+    current, max_pids = stats
+    if max_pids is None:
+        return True
+    return (max_pids - current) >= min_free
+
+
+def _prewarm_launcher(slot):
+    # Prewarming is opportunistic: without PID headroom, skip it rather than wait,
+    # and leave the launch to a monitor's own headroom wait.
+    if not _has_pid_headroom(_pid_min_free()):
+        raise SessionNotCreatedException("PID_HEADROOM: insufficient PID headroom to prewarm Chrome.")
+    return _create_driver(slot)
+
+
+def prewarm_driver_pool():
+    """Start CHROME_POOL_PREWARM idle Chrome instances in the background (call once at boot)."""
+    return _DRIVER_POOL.prewarm(_env_int("CHROME_POOL_PREWARM", 1), launcher=_prewarm_launcher)
+
+
 class AttendanceMonitor:
     """
     Monitors the KBTU attendance page for a single user.
-    Runs in its own thread with its own Chrome instance.
+    Runs in its own thread and checks a Chrome instance out of the shared driver pool.
 
     Callbacks:
         on_attendance_found(username, status)
@@ -35,9 +285,11 @@ class AttendanceMonitor:
             status = "found"   → manual mode, waiting for user action
         on_status_update(username, message)
             general status messages (login, errors, etc.)
+        on_death(monitor)
+            the worker thread exited without stop() being called (crash, gave up)
     """
 
-    def __init__(self, username, password, on_attendance_found=None, on_status_update=None, mode="automatic", url=None, skip_login=False):
+    def __init__(self, username, password, on_attendance_found=None, on_status_update=None, mode="automatic", url=None, skip_login=False, on_death=None):
         self.username = username
         self.password = password
         self.mode = mode
@@ -45,20 +297,21 @@ class AttendanceMonitor:
         self.skip_login = skip_login
         self.on_attendance_found = on_attendance_found
         self.on_status_update = on_status_update
+        self.on_death = on_death
 
         self._stop_event = threading.Event()
         self._thread = None
         self._driver = None
+        self._slot = None
         self._driver_lock = threading.Lock()
         self._pending_mark = False  # True when manual mode found button, waiting for user
-        safe_id = hashlib.sha1(username.encode("utf-8")).hexdigest()[:12]
-        self._profile_tag = f"kbtu-chrome-profile-{safe_id}"
-        tmp_dir = tempfile.gettempdir()
-        self._profile_dir = os.path.join(tmp_dir, self._profile_tag)
-        self._chromedriver_log_path = os.path.join(tmp_dir, f"kbtu-chromedriver-{safe_id}.log")
+        self._mark_cond = threading.Condition()  # notified when _pending_mark clears or stop() is called
+        self._chromedriver_log_path = None
         self._chrome_restart_every = max(0, _env_int("CHROME_RESTART_EVERY", 40))
-        self._pid_min_free = max(5, _env_int("CHROME_PID_MIN_FREE", 20))
+        self._pid_min_free = _pid_min_free()
         self._pid_wait_max = max(0, _env_int("CHROME_PID_WAIT_MAX", 300))
+        self._session_check_interval = max(0, _env_int("SESSION_CHECK_INTERVAL", 60))
+        self._last_login_check = float("-inf")  # monotonic time the session was last seen logged in; -inf = never
 
     # Public API
 
@@ -66,25 +319,28 @@ class AttendanceMonitor:
         if self._thread and self._thread.is_alive():
             return
         self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread = threading.Thread(target=self._thread_main, daemon=True)
         self._thread.start()
 
     def stop(self):
         self._stop_event.set()
-        with self._driver_lock:
-            if self._driver:
-                try:
-                    self._driver.quit()
-                except Exception:
-                    pass
-                self._driver = None
-        self._kill_stale_profile_processes()
+        with self._mark_cond:
+            self._mark_cond.notify_all()
         if (
             self._thread
             and self._thread.is_alive()
             and threading.current_thread() is not self._thread
         ):
             self._thread.join(timeout=10)
+            if self._thread.is_alive():
+                # Worker is stuck inside a driver call: kill the browser so it unwinds.
+                # The slot then fails its reset on release and is discarded by the pool.
+                driver = self._driver
+                if driver:
+                    try:
+                        driver.quit()
+                    except Exception:
+                        pass
 
     def is_running(self):
         return self._thread is not None and self._thread.is_alive()
@@ -98,13 +354,14 @@ class AttendanceMonitor:
             if not self._driver or not self._pending_mark:
                 return False
             try:
-                btn = WebDriverWait(self._driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH,
-                        "//span[@class='v-button-caption' and text()='\u041e\u0442\u043c\u0435\u0442\u0438\u0442\u044c\u0441\u044f']"
-                        "/ancestor::div[contains(@class, 'v-button')]"))
-                )
+                btn = self._find_enabled_button(self._driver)
+                if btn is None:
+                    self._notify_status(f"[{self.username}] Failed to mark: attendance button is no longer available")
+                    return False
                 btn.click()
                 self._pending_mark = False
+                with self._mark_cond:
+                    self._mark_cond.notify_all()
                 self._notify_found(self.username, "marked")
                 return True
             except Exception as e:
@@ -113,6 +370,16 @@ class AttendanceMonitor:
 
     # ── Internal ──
 
+    def _thread_main(self):
+        try:
+            self._run()
+        finally:
+            if not self._stop_event.is_set() and self.on_death:
+                try:
+                    self.on_death(self)
+                except Exception:
+                    pass
+
     def _notify_found(self, username, status):
         if self.on_attendance_found:
             try:
@@ -127,20 +394,9 @@ class AttendanceMonitor:
             except Exception:
                 pass
 
-    def _reset_profile_dir(self):
-        try:
-            shutil.rmtree(self._profile_dir, ignore_errors=True)
-            os.makedirs(self._profile_dir, exist_ok=True)
-        except Exception:
-            pass
-
-    def _purge_profile_dir(self):
-        try:
-            shutil.rmtree(self._profile_dir, ignore_errors=True)
-        except Exception:
-            pass
-
     def _tail_chromedriver_log(self, lines=40):
+        if not self._chromedriver_log_path:
+            return ""
         try:
             with open(self._chromedriver_log_path, "r", encoding="utf-8", errors="replace") as f:
                 data = f.readlines()
@@ -148,22 +404,13 @@ class AttendanceMonitor:
         except Exception:
             return ""
 
-    def _pick_chrome_binary(self):
-        configured = os.environ.get("CHROME_BIN")
-        if configured and os.path.exists(configured):
-            return configured
-
-        # Prefer the real Chromium binary over the wrapper script in constrained containers.
-        candidates = (
-            "/usr/lib/chromium/chromium",
-            "/usr/bin/chromium",
-            "/usr/bin/chromium-browser",
-            "/usr/bin/google-chrome",
-        )
-        for candidate in candidates:
-            if os.path.exists(candidate):
-                return candidate
-        return None
+    def _launch_driver(self, slot):
+        if not self._wait_for_pid_headroom():
+            raise SessionNotCreatedException(
+                "PID_HEADROOM_TIMEOUT: Insufficient PID headroom to launch Chrome."
+            )
+        self._chromedriver_log_path = slot.log_path
+        return _create_driver(slot)
 
     def _pid_pressure_snapshot(self):
         values = []
@@ -180,51 +427,17 @@ class AttendanceMonitor:
                 pass
         return ", ".join(values)
 
-    def _read_cgroup_pid_stats(self):
-        # cgroup v2 first, then v1 fallback
-        candidates = (
-            ("/sys/fs/cgroup/pids.current", "/sys/fs/cgroup/pids.max"),
-            ("/sys/fs/cgroup/pids/pids.current", "/sys/fs/cgroup/pids/pids.max"),
-        )
-        for current_path, max_path in candidates:
-            try:
-                with open(current_path, "r", encoding="utf-8") as f:
-                    current_raw = f.read().strip()
-                with open(max_path, "r", encoding="utf-8") as f:
-                    max_raw = f.read().strip()
-            except Exception:
-                continue
-
-            try:
-                current = int(current_raw)
-            except Exception:
-                continue
-
-            if max_raw == "max":
-                return current, None
-            try:
-                return current, int(max_raw)
-            except Exception:
-                return current, None
-        return None
-
     def _wait_for_pid_headroom(self):
         min_free = self._pid_min_free
         max_wait = self._pid_wait_max
 
-        stats = self._read_cgroup_pid_stats()
-        if not stats:
-            return True
-        current, max_pids = stats
-        if max_pids is None:
-            return True
-        if (max_pids - current) >= min_free:
+        if _has_pid_headroom(min_free):
             return True
 
         deadline = time.time() + max_wait
         next_log = 0
         while not self._stop_event.is_set():
-            stats = self._read_cgroup_pid_stats()
+            stats = _read_cgroup_pid_stats()
             if not stats:
                 return True
             current, max_pids = stats
@@ -244,190 +457,107 @@ class AttendanceMonitor:
 
             if now >= deadline:
                 return False
-            time.sleep(1)
+            self._stop_event.wait(1)
         return False
 
-    def _kill_stale_profile_processes(self):
-        if os.name != "posix":
-            return
-        proc_dir = "/proc"
-        if not os.path.isdir(proc_dir):
-            return
-
-        killed = 0
-        me = os.getpid()
-        for name in os.listdir(proc_dir):
-            if not name.isdigit():
-                continue
-            pid = int(name)
-            if pid == me:
-                continue
-            cmdline_path = os.path.join(proc_dir, name, "cmdline")
-            try:
-                with open(cmdline_path, "rb") as f:
-                    raw = f.read()
-            except Exception:
-                continue
-            if not raw:
-                continue
-            cmd = raw.replace(b"\x00", b" ").decode("utf-8", errors="ignore")
-            if self._profile_tag not in cmd:
-                continue
-
-            try:
-                os.kill(pid, signal.SIGKILL)
-                killed += 1
-            except ProcessLookupError:
-                pass
-            except PermissionError:
-                pass
-            except Exception:
-                pass
-
-        if killed:
-            self._notify_status(f"[{self.username}] Cleaned stale Chromium processes: {killed}")
-
-    def _create_driver(self):
-        self._kill_stale_profile_processes()
-        if not self._wait_for_pid_headroom():
-            raise SessionNotCreatedException(
-                "PID_HEADROOM_TIMEOUT: Insufficient PID headroom to launch Chrome."
-            )
-        self._reset_profile_dir()
-
-        options = Options()
-        options.add_argument("--ignore-certificate-errors")
-
-        headless_mode = os.environ.get("CHROME_HEADLESS_MODE", "new").strip().lower()
-        if headless_mode in ("legacy", "old", "classic"):
-            options.add_argument("--headless")
-        else:
-            options.add_argument("--headless=new")
-
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-background-networking")
-        options.add_argument("--disable-default-apps")
-        options.add_argument("--disable-sync")
-        options.add_argument("--disable-translate")
-        options.add_argument("--disable-breakpad")
-        options.add_argument("--disable-crash-reporter")
-        options.add_argument("--disable-features=Crashpad")
-        options.add_argument("--disable-background-timer-throttling")
-        options.add_argument("--disable-renderer-backgrounding")
-        options.add_argument("--disable-backgrounding-occluded-windows")
-        options.add_argument("--renderer-process-limit=1")
-        options.add_argument("--no-zygote")
-        pid_stats = self._read_cgroup_pid_stats()
-        if pid_stats and pid_stats[1] and pid_stats[1] <= 1500:
-            # Low PID ceilings benefit from single-process mode.
-            options.add_argument("--single-process")
-        options.add_argument("--no-first-run")
-        options.add_argument("--window-size=1280,800")
-        options.add_argument("--remote-debugging-pipe")
-        options.add_argument(f"--user-data-dir={self._profile_dir}")
-
-        # Use a known local browser binary path; avoid wrapper scripts when possible.
-        chrome_bin = self._pick_chrome_binary()
-        if chrome_bin:
-            options.binary_location = chrome_bin
-
-        extra_args = os.environ.get("CHROME_EXTRA_ARGS", "").strip()
-        if extra_args:
-            for arg in extra_args.split():
-                options.add_argument(arg)
-
-        service_args = ["--verbose", f"--log-path={self._chromedriver_log_path}"]
-        chromedriver_path = os.environ.get("CHROMEDRIVER_PATH")
-        if chromedriver_path:
-            driver = webdriver.Chrome(
-                service=Service(chromedriver_path, service_args=service_args),
-                options=options,
-            )
-        else:
-            driver = webdriver.Chrome(
-                service=Service(service_args=service_args),
-                options=options,
-            )
-        return driver
-
     def _do_login(self, driver, wait):
         self._notify_status(f"[{self.username}] Logging in...")
         driver.get(self.url)
 
-        username_field = wait.until(
-            EC.presence_of_element_located(
-                (By.XPATH, "//input[contains(@class, 'v-filterselect-input')]")
-            )
-        )
+        username_field = wait.until(EC.presence_of_element_located(LOC_USERNAME))
         username_field.clear()
         username_field.send_keys(self.username)
-        time.sleep(0.5)
+        try:
+            # The combobox filters server-side; its suggestion popup marks the round trip as done.
+            WebDriverWait(driver, 1, poll_frequency=0.1).until(
+                EC.presence_of_element_located(LOC_USERNAME_SUGGESTIONS)
+            )
+        except TimeoutException:
+            pass
 
-        password_field = driver.find_element(By.XPATH, "//input[@type='password']")
+        password_field = driver.find_element(*LOC_PASSWORD)
         password_field.clear()
         password_field.send_keys(self.password)
 
-        login_button = driver.find_element(
-            By.XPATH, "//div[contains(@class, 'v-button') and contains(@class, 'primary')]"
-        )
+        login_button = driver.find_element(*LOC_LOGIN_BTN)
         login_button.click()
-        time.sleep(5)
-
-        self._notify_status(f"[{self.username}] After login URL: {driver.current_url}")
-
-        # Screenshot
         try:
-            screenshot_path = f"/tmp/login_result_{self.username}.png"
-            driver.save_screenshot(screenshot_path)
-            self._notify_status(f"[{self.username}] Screenshot saved to {screenshot_path}")
-        except Exception:
+            # Vaadin swaps the login view out on success and raises a notification on failure.
+            WebDriverWait(driver, 8).until(EC.any_of(
+                EC.staleness_of(login_button),
+                EC.presence_of_element_located(LOC_NOTIFICATION),
+            ))
+        except TimeoutException:
             pass
 
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("[%s] After login URL: %s", self.username, driver.current_url)
+
+            # Screenshot
+            try:
+                screenshot_path = f"/tmp/login_result_{self.username}.png"
+                driver.save_screenshot(screenshot_path)
+                logger.debug("[%s] Screenshot saved to %s", self.username, screenshot_path)
+            except Exception:
+                pass
+
         # Check for errors on page
         try:
-            errors = driver.find_elements(By.XPATH,
-                "//*[contains(@class, 'error') or contains(@class, 'v-Notification') or contains(@class, 'warning')]")
+            errors = driver.find_elements(*LOC_PAGE_ERRORS)
             for err in errors:
                 if err.text.strip():
                     self._notify_status(f"[{self.username}] [ERROR ON PAGE] {err.text}")
         except Exception:
             pass
 
-        # Page text (first 500 chars)
+        if debug:
+            # Page text (first 500 chars)
+            try:
+                body_text = driver.find_element(By.TAG_NAME, "body").text
+                logger.debug("[%s] [PAGE TEXT] %s", self.username, body_text[:500])
+            except Exception:
+                pass
+
+        snapshot = self._page_snapshot(driver)
+        if debug and snapshot:
+            logger.debug("[%s] [POST-LOGIN BUTTONS] %s", self.username, snapshot["captions"])
+
+        if self._is_session_expired(snapshot):
+            self._last_login_check = float("-inf")
+            self._notify_status(f"[{self.username}] !!! LOGIN FAILED - still on login page !!!")
+        else:
+            self._last_login_check = time.monotonic() if snapshot is not None else float("-inf")
+            self._notify_status(f"[{self.username}] LOGIN SUCCESS - inside the app")
+
+    def _page_snapshot(self, driver):
         try:
-            body_text = driver.find_element(By.TAG_NAME, "body").text
-            self._notify_status(f"[{self.username}] [PAGE TEXT] {body_text[:500]}")
+            return driver.execute_script(PAGE_SNAPSHOT_JS)
         except Exception:
-            pass
+            return None
 
-        # Post-login buttons
+    def _watch_for_button(self, driver):
         try:
-            all_buttons = driver.find_elements(By.XPATH, "//span[@class='v-button-caption']")
-            btn_texts = [b.text for b in all_buttons if b.text.strip()]
-            self._notify_status(f"[{self.username}] [POST-LOGIN BUTTONS] {btn_texts}")
-            if '\u041a\u0456\u0440\u0443' in btn_texts or '\u0412\u043e\u0439\u0442\u0438' in btn_texts:
-                self._notify_status(f"[{self.username}] !!! LOGIN FAILED - still on login page !!!")
-            else:
-                self._notify_status(f"[{self.username}] LOGIN SUCCESS - inside the app")
-        except Exception as e:
-            self._notify_status(f"[{self.username}] Error checking buttons: {e}")
-
-    def _is_session_expired(self, driver):
+            return bool(driver.execute_script(BUTTON_WATCH_JS, OTMETITSYA_CAPTION))
+        except Exception:
+            return True  # observer unavailable: fall back to looking for the button directly
+
+    def _find_enabled_button(self, driver):
+        return driver.execute_script(ENABLED_BUTTON_JS, OTMETITSYA_CAPTION)
+
+    def _button_flagged(self, driver):
         try:
-            buttons = driver.find_elements(By.XPATH, "//span[@class='v-button-caption']")
-            for btn in buttons:
-                if btn.text in ["\u041a\u0456\u0440\u0443", "\u0412\u043e\u0439\u0442\u0438", "Login"]:
-                    return True
-            login_fields = driver.find_elements(By.XPATH, "//input[@type='password']")
-            if login_fields:
-                return True
-            return False
+            return driver.execute_script(BUTTON_FLAG_JS) is True
         except Exception:
             return False
 
+    def _is_session_expired(self, snapshot):
+        if not snapshot:
+            return False
+        if snapshot.get("password"):
+            return True
+        return any(caption in LOGIN_CAPTIONS for caption in snapshot.get("captions", ()))
+
     def _run(self):
         self._notify_status(f"[{self.username}] Starting monitor...")
         restart_count = 0
@@ -437,14 +567,17 @@ class AttendanceMonitor:
             if restart_count > 0:
                 wait_time = min(30, 5 * restart_count)
                 self._notify_status(f"[{self.username}] Restarting monitor (attempt {restart_count}/{max_restarts}) in {wait_time}s...")
-                for _ in range(wait_time):
-                    if self._stop_event.is_set():
-                        return
-                    time.sleep(1)
+                if self._stop_event.wait(wait_time):
+                    return
 
+            recycle = False
             try:
+                slot = _DRIVER_POOL.acquire(self._launch_driver, stop_event=self._stop_event)
+                if slot is None:
+                    break
                 with self._driver_lock:
-                    self._driver = self._create_driver()
+                    self._slot = slot
+                    self._driver = slot.driver
                 driver = self._driver
                 wait = WebDriverWait(driver, 15)
                 if not self.skip_login:
@@ -453,82 +586,111 @@ class AttendanceMonitor:
                 restart_count = 0  # Reset on successful start
 
                 refresh_count = 0
+                reload = True
                 while not self._stop_event.is_set():
-                    refresh_count += 1
-
-                    # Periodic Chrome restart to prevent memory leaks
-                    if self._chrome_restart_every > 0 and refresh_count > self._chrome_restart_every:
-                        self._notify_status(f"[{self.username}] Restarting Chrome to free memory...")
-                        break  # exits inner loop, goes to finally which quits driver, then outer loop creates new one
+                    if reload:
+                        refresh_count += 1
 
-                    self._notify_status(
-                        f"[{self.username}] [{time.strftime('%H:%M:%S')}] Refresh #{refresh_count}"
-                    )
+                        # Periodic Chrome restart to prevent memory leaks
+                        if self._chrome_restart_every > 0 and refresh_count > self._chrome_restart_every:
+                            self._notify_status(f"[{self.username}] Restarting Chrome to free memory...")
+                            recycle = True
+                            break  # exits inner loop, finally discards the driver, then outer loop launches a new one
 
-                    with self._driver_lock:
-                        if self._driver is None:
-                            break
-                        driver.get(self.url)
+                        logger.info("[%s] Refresh #%d", self.username, refresh_count)
+                        # Measured from the start of the reload, so page-load time does not stretch the cadence.
+                        next_refresh = time.monotonic() + REFRESH_INTERVAL + random.uniform(-REFRESH_JITTER, REFRESH_JITTER)
 
-                    time.sleep(3)
+                        with self._driver_lock:
+                            if self._driver is None:
+                                break
+                            driver.get(self.url)
 
-                    # Debug: show current URL and all buttons
-                    self._notify_status(f"[{self.username}] [URL] {driver.current_url}")
-                    try:
-                        all_buttons = driver.find_elements(By.XPATH, "//span[@class='v-button-caption']")
-                        btn_texts = [b.text for b in all_buttons if b.text.strip()]
-                        self._notify_status(f"[{self.username}] [ALL BUTTONS] {btn_texts}")
-                    except Exception:
-                        pass
-
-                    if not self.skip_login and self._is_session_expired(driver):
-                        self._notify_status(f"[{self.username}] Session expired, re-logging in...")
-                        self._do_login(driver, wait)
-                        time.sleep(5)
+                        try:
+                            wait.until(EC.presence_of_element_located(LOC_CAPTIONS))
+                        except TimeoutException:
+                            pass
 
-                    # Look for attendance button
-                    try:
-                        otmetitsya_button = WebDriverWait(driver, 5).until(
-                            EC.element_to_be_clickable((By.XPATH,
-                                "//span[@class='v-button-caption' and text()='\u041e\u0442\u043c\u0435\u0442\u0438\u0442\u044c\u0441\u044f']"
-                                "/ancestor::div[contains(@class, 'v-button')]"))
+                        debug = logger.isEnabledFor(logging.DEBUG)
+                        # A session verified within the interval is trusted without re-checking.
+                        check_session = (
+                            not self.skip_login
+                            and time.monotonic() - self._last_login_check >= self._session_check_interval
                         )
+                        snapshot = self._page_snapshot(driver) if check_session or debug else None
+
+                        # Debug: show current URL and all buttons
+                        if debug:
+                            logger.debug("[%s] [URL] %s", self.username, driver.current_url)
+                            if snapshot:
+                                logger.debug("[%s] [ALL BUTTONS] %s", self.username, snapshot["captions"])
+
+                        if check_session:
+                            if self._is_session_expired(snapshot):
+                                self._notify_status(f"[{self.username}] Session expired, re-logging in...")
+                                self._do_login(driver, wait)
+                            elif snapshot is not None:
+                                # A failed snapshot proves nothing; leave the check due for the next refresh.
+                                self._last_login_check = time.monotonic()
+
+                        button_ready = self._watch_for_button(driver)
+                        watch_until = time.monotonic() + BUTTON_WATCH_WINDOW
+                    else:
+                        # The observer saw the button render during the last wait; act on the live page.
+                        button_ready = True
+                    reload = True
 
-                        if self.mode == "automatic":
-                            otmetitsya_button.click()
-                            self._notify_status(f"[{self.username}] Attendance button clicked!")
-                            self._notify_found(self.username, "marked")
-                            time.sleep(2)
-                        else:
-                            # Manual mode: notify user, wait for mark_now()
-                            self._pending_mark = True
-                            self._notify_found(self.username, "found")
-                            self._notify_status(f"[{self.username}] Attendance available! Waiting for manual mark...")
-                            # Wait up to 5 minutes for user to press Mark Now
-                            waited = 0
-                            while self._pending_mark and waited < 300 and not self._stop_event.is_set():
-                                time.sleep(2)
-                                waited += 2
-                            if self._pending_mark:
-                                self._notify_status(f"[{self.username}] Manual mark timed out.")
-                                self._pending_mark = False
-
-                    except Exception:
-                        # Button not available — debug: show visible buttons
+                    # Look for attendance button; skipped outright when the observer has not seen it.
+                    otmetitsya_button = None
+                    if button_ready:
                         try:
-                            buttons = driver.find_elements(By.XPATH,
-                                "//div[contains(@class, 'v-button')]//span[@class='v-button-caption']")
-                            btn_texts = [b.text for b in buttons if b.text.strip()]
-                            if btn_texts:
-                                self._notify_status(f"[{self.username}] [DEBUG] Buttons on page: {btn_texts}")
+                            otmetitsya_button = self._find_enabled_button(driver)
+                        except Exception:
+                            pass
+                    if otmetitsya_button is not None:
+                        try:
+                            if self.mode == "automatic":
+                                otmetitsya_button.click()
+                                self._notify_status(f"[{self.username}] Attendance button clicked!")
+                                self._notify_found(self.username, "marked")
+                                try:
+                                    # Vaadin re-renders the view once the mark is accepted.
+                                    WebDriverWait(driver, 2, poll_frequency=0.1).until(
+                                        EC.staleness_of(otmetitsya_button)
+                                    )
+                                except TimeoutException:
+                                    pass
+                            else:
+                                # Manual mode: notify user, wait for mark_now()
+                                self._pending_mark = True
+                                self._notify_found(self.username, "found")
+                                self._notify_status(f"[{self.username}] Attendance available! Waiting for manual mark...")
+                                # Wait up to 5 minutes for user to press Mark Now
+                                with self._mark_cond:
+                                    self._mark_cond.wait_for(
+                                        lambda: not self._pending_mark or self._stop_event.is_set(),
+                                        timeout=300,
+                                    )
+                                if self._pending_mark:
+                                    self._notify_status(f"[{self.username}] Manual mark timed out.")
+                                    self._pending_mark = False
+
                         except Exception:
+                            # Button went away mid-click; the captions were already dumped from the snapshot above.
                             pass
 
-                    # Wait before next refresh
-                    for _ in range(REFRESH_INTERVAL):
-                        if self._stop_event.is_set():
-                            break
-                        time.sleep(1)
+                    # Wait before next refresh. The server only reveals the button on a reload, so the
+                    # observer is polled just briefly, for a late render of the page just loaded.
+                    if not button_ready:
+                        watch_end = min(watch_until, next_refresh)
+                        while not self._stop_event.wait(BUTTON_WATCH_POLL):
+                            if self._button_flagged(driver):
+                                reload = False
+                                break
+                            if time.monotonic() >= watch_end:
+                                break
+                    if reload:
+                        self._stop_event.wait(max(0.0, next_refresh - time.monotonic()))
 
             except Exception as e:
                 self._notify_status(f"[{self.username}] Monitor error ({type(e).__name__}): {e}")
@@ -548,18 +710,18 @@ class AttendanceMonitor:
                     log_tail = self._tail_chromedriver_log()
                     if log_tail:
                         self._notify_status(f"[{self.username}] [ChromeDriver log tail]\n{log_tail}")
+                recycle = True
                 restart_count += 1
             finally:
                 with self._driver_lock:
-                    if self._driver:
-                        try:
-                            self._driver.quit()
-                        except Exception:
-                            pass
-                        self._driver = None
+                    slot, self._slot = self._slot, None
+                    self._driver = None
                 self._pending_mark = False
-                self._purge_profile_dir()
-                self._kill_stale_profile_processes()
+                if slot is not None:
+                    if recycle:
+                        _DRIVER_POOL.discard(slot)
+                    else:
+                        _DRIVER_POOL.release(slot)
 
         if restart_count > max_restarts:
             self._notify_status(f"[{self.username}] Monitor gave up after {max_restarts} restarts.")
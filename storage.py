@@ -1,19 +1,114 @@
 import os
 import json
+import time
+import base64
+import hashlib
+import atexit
 import string
 import random
+import logging
 import threading
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # optional speed-up; the stdlib json module produces the same files
+    orjson = None
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # only needed when STORAGE_KEY is set
+    Fernet = None
+
 DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 STUDENTS_FILE = os.path.join(DATA_DIR, "students.json")
 INVITATIONS_FILE = os.path.join(DATA_DIR, "invitations.json")
+# Append-only change logs replayed over the JSON snapshots at startup.
+LOG_FILES = {
+    STUDENTS_FILE: os.path.join(DATA_DIR, "students.log"),
+    INVITATIONS_FILE: os.path.join(DATA_DIR, "invitations.log"),
+}
+WRITE_DELAY = 0.2  # seconds; mutations landing within this window share one append + fsync
+COMPACT_MIN_LINES = 100  # never compact a log shorter than this, however few records are live
+
+logger = logging.getLogger(__name__)
+
+
+def _load_cipher():
+    """Fernet cipher keyed by STORAGE_KEY, or None when passwords are stored in plain text."""
+    secret = os.environ.get("STORAGE_KEY", "").strip()
+    if not secret:
+        return None
+    if Fernet is None:
+        raise RuntimeError("STORAGE_KEY is set but the 'cryptography' package is not installed")
+    # Any passphrase works: PBKDF2 stretches it into the 32-byte key Fernet expects.
+    key = hashlib.pbkdf2_hmac("sha256", secret.encode("utf-8"), b"att-marker-v2/storage", 200_000)
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def _fsync_dir(path):
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _encode_line(obj):
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _decode_line(line):
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
 
 
 class Storage:
+    """
+    JSON-file storage held in memory, persisted as snapshot + change log.
+
+    At startup each JSON snapshot is parsed and its .log replayed on top;
+    reads are dict lookups. Mutations queue the changed record and a background
+    writer appends one {"op": "upsert"} line per record after a short debounce,
+    so a write costs bytes proportional to the change, not to the file. Once a
+    log outgrows twice the live record count it is folded back into the snapshot.
+
+    The cached dicts are copy-on-write: mutators build new top-level and record
+    dicts, so getters hand out the live objects without copying them.
+
+    With STORAGE_KEY set, student passwords are Fernet-encrypted on disk
+    ("password_encrypted") and only ever held in plain text in memory.
+    """
+
     def __init__(self):
         self._lock = threading.Lock()
+        self._pending_cond = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._pending = {}  # path -> ordered keys changed since the last flush
+        self._cipher = _load_cipher()
+        if self._cipher is None:
+            logger.warning("STORAGE_KEY not set: student passwords are stored in plain text")
         self._ensure_data_dir()
+        self._data = {}
+        self._log_lines = {}
+        for path in LOG_FILES:
+            data, lines = self._load(path)
+            migrate = False
+            if path == STUDENTS_FILE:
+                # Plain-text passwords left over from before the key was set get encrypted below.
+                migrate = self._cipher is not None and any("password" in r for r in data.values())
+                data = {key: self._unseal(record) for key, record in data.items()}
+            self._data[path], self._log_lines[path] = data, lines
+            if lines or migrate:
+                # Start from an empty log: appends must never land after a torn tail line.
+                self._compact(path)
+        threading.Thread(target=self._writer_loop, name="storage-writer", daemon=True).start()
+        atexit.register(self.compact)
 
     def _ensure_data_dir(self):
         os.makedirs(DATA_DIR, exist_ok=True)
@@ -24,30 +119,163 @@ class Storage:
 
     def _read_json(self, path):
         try:
+            if orjson is not None:
+                with open(path, "rb") as f:
+                    return orjson.loads(f.read())
             with open(path, "r", encoding="utf-8") as f:
                 return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+        except (ValueError, FileNotFoundError):  # orjson.JSONDecodeError and json.JSONDecodeError are ValueErrors
             return {}
 
     def _write_json(self, path, data):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Write a sibling temp file and swap it in, so a crash mid-write never leaves a torn file.
+        # Both the contents and the rename are fsynced: compaction truncates the log right after.
+        tmp_path = path + ".tmp"
+        if orjson is not None:
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_dir(os.path.dirname(path))
+
+    def _load(self, path):
+        """Return (snapshot with the log replayed over it, number of log lines)."""
+        data = self._read_json(path)
+        lines = 0
+        try:
+            with open(LOG_FILES[path], "rb") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        event = _decode_line(line)
+                    except ValueError:
+                        # Only the tail can be torn (crash mid-append); that change was never acknowledged.
+                        logger.warning("Skipping unreadable line %d in %s", lines, LOG_FILES[path])
+                        continue
+                    if event.get("op") == "upsert":
+                        data[event["id"]] = event["data"]
+        except FileNotFoundError:
+            pass
+        return data, lines
+
+    def _seal(self, record):
+        if self._cipher is None or "password" not in record:
+            return record
+        sealed = dict(record)
+        password = sealed.pop("password")
+        sealed["password_encrypted"] = self._cipher.encrypt(password.encode("utf-8")).decode("ascii")
+        return sealed
+
+    def _unseal(self, record):
+        token = record.get("password_encrypted")
+        if token is None:
+            return record
+        if self._cipher is None:
+            raise RuntimeError("students.json holds encrypted passwords but STORAGE_KEY is not set")
+        try:
+            password = self._cipher.decrypt(token.encode("ascii")).decode("utf-8")
+        except InvalidToken:
+            raise RuntimeError("STORAGE_KEY does not match the key the stored passwords were encrypted with")
+        opened = dict(record)
+        del opened["password_encrypted"]
+        opened["password"] = password
+        return opened
+
+    def _on_disk(self, path, record):
+        return self._seal(record) if path == STUDENTS_FILE else record
+
+    def _set(self, path, data, key):
+        """Swap in a new version of a file's dict and queue ``key`` for the writer. Caller holds self._lock."""
+        self._data[path] = data
+        self._pending.setdefault(path, {})[key] = None
+        self._pending_cond.notify()
+
+    def _writer_loop(self):
+        while True:
+            with self._pending_cond:
+                while not self._pending:
+                    self._pending_cond.wait()
+            time.sleep(WRITE_DELAY)
+            self.flush()
+
+    def flush(self):
+        """Append every queued change to its log now, compacting logs that have grown too long."""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                # Records are never mutated in place, so they can be encoded outside the lock.
+                batches = {
+                    path: [(key, self._data[path][key]) for key in keys]
+                    for path, keys in pending.items()
+                }
+            for path, records in batches.items():
+                payload = b"".join(
+                    _encode_line({"op": "upsert", "id": key, "data": self._on_disk(path, record)})
+                    for key, record in records
+                )
+                try:
+                    with open(LOG_FILES[path], "ab") as f:
+                        f.write(payload)
+                        f.flush()
+                        os.fsync(f.fileno())
+                except Exception as e:
+                    logger.error("Failed to append to %s: %s", LOG_FILES[path], e)
+                    with self._lock:
+                        queued = self._pending.setdefault(path, {})
+                        for key, _ in records:
+                            queued.setdefault(key, None)
+                    continue
+                self._log_lines[path] += len(records)
+                if self._log_lines[path] > max(COMPACT_MIN_LINES, 2 * len(self._data[path])):
+                    self._compact(path)
+
+    def compact(self):
+        """Flush, then fold every log into its snapshot. Registered to run at exit."""
+        self.flush()
+        with self._flush_lock:
+            for path in LOG_FILES:
+                if self._log_lines[path]:
+                    self._compact(path)
+
+    def _compact(self, path):
+        # Caller holds self._flush_lock. The snapshot is durably in place (fsynced file and
+        # directory) before the log is truncated; a crash in between only replays upserts
+        # the snapshot already holds.
+        with self._lock:
+            data = self._data[path]
+        try:
+            if path == STUDENTS_FILE and self._cipher is not None:
+                data = {key: self._seal(record) for key, record in data.items()}
+            self._write_json(path, data)
+            with open(LOG_FILES[path], "wb"):
+                pass
+        except Exception as e:
+            logger.error("Failed to compact %s: %s", path, e)
+            return
+        self._log_lines[path] = 0
 
     # students
 
     def get_all_students(self):
         with self._lock:
-            return self._read_json(STUDENTS_FILE)
+            return self._data[STUDENTS_FILE]
 
     def get_student(self, telegram_id):
         with self._lock:
-            students = self._read_json(STUDENTS_FILE)
+            students = self._data[STUDENTS_FILE]
             return students.get(str(telegram_id))
 
     def add_student(self, telegram_id, username, password, invitation_code):
         with self._lock:
-            students = self._read_json(STUDENTS_FILE)
-            students[str(telegram_id)] = {
+            students = dict(self._data[STUDENTS_FILE])
+            key = str(telegram_id)
+            students[key] = {
                 "telegram_id": telegram_id,
                 "username": username,
                 "password": password,
@@ -56,15 +284,15 @@ class Storage:
                 "invitation_code": invitation_code,
                 "registered_at": datetime.now().isoformat(),
             }
-            self._write_json(STUDENTS_FILE, students)
+            self._set(STUDENTS_FILE, students, key)
 
     def update_student(self, telegram_id, **kwargs):
         with self._lock:
-            students = self._read_json(STUDENTS_FILE)
+            students = dict(self._data[STUDENTS_FILE])
             key = str(telegram_id)
             if key in students:
-                students[key].update(kwargs)
-                self._write_json(STUDENTS_FILE, students)
+                students[key] = {**students[key], **kwargs}
+                self._set(STUDENTS_FILE, students, key)
                 return True
             return False
 
@@ -72,34 +300,37 @@ class Storage:
 
     def get_all_invitations(self):
         with self._lock:
-            return self._read_json(INVITATIONS_FILE)
+            return self._data[INVITATIONS_FILE]
 
     def get_invitation(self, code):
         with self._lock:
-            invitations = self._read_json(INVITATIONS_FILE)
+            invitations = self._data[INVITATIONS_FILE]
             return invitations.get(code)
 
     def create_invitation(self, created_by):
         code = "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
         with self._lock:
-            invitations = self._read_json(INVITATIONS_FILE)
+            invitations = dict(self._data[INVITATIONS_FILE])
             invitations[code] = {
                 "created_by": created_by,
                 "created_at": datetime.now().isoformat(),
                 "used_by": None,
                 "used_at": None,
             }
-            self._write_json(INVITATIONS_FILE, invitations)
+            self._set(INVITATIONS_FILE, invitations, code)
         return code
 
     def use_invitation(self, code, telegram_id):
         with self._lock:
-            invitations = self._read_json(INVITATIONS_FILE)
+            invitations = dict(self._data[INVITATIONS_FILE])
             if code not in invitations:
                 return False
             if invitations[code]["used_by"] is not None:
                 return False
-            invitations[code]["used_by"] = telegram_id
-            invitations[code]["used_at"] = datetime.now().isoformat()
-            self._write_json(INVITATIONS_FILE, invitations)
+            invitations[code] = {
+                **invitations[code],
+                "used_by": telegram_id,
+                "used_at": datetime.now().isoformat(),
+            }
+            self._set(INVITATIONS_FILE, invitations, code)
             return True
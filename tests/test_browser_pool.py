@@ -0,0 +1,108 @@
+import tempfile
+import threading
+
+import pytest
+
+import browser_pool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def get(self, url):
+        pass
+
+    def execute_cdp_cmd(self, cmd, params):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+class Launcher:
+    """launcher(slot) that records every launch and can be held on an Event."""
+
+    def __init__(self, gate=None, fail=False):
+        self.gate = gate
+        self.fail = fail
+        self.started = threading.Event()
+        self.drivers = []
+
+    def __call__(self, slot):
+        self.started.set()
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("launch failed")
+        driver = FakeDriver()
+        self.drivers.append(driver)
+        return driver
+
+
+@pytest.fixture(autouse=True)
+def isolated_tmp(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(browser_pool, "kill_profile_processes", lambda tag: 0)
+
+
+def acquire_in_thread(pool):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("slot", pool.acquire()))
+    thread.start()
+    return thread, result
+
+
+def test_acquire_during_prewarm_gets_the_prewarmed_driver():
+    gate = threading.Event()
+    prewarm = Launcher(gate=gate)
+    fallback = Launcher()
+    pool = browser_pool.DriverPool(fallback, max_drivers=3, max_idle=1)
+
+    pool.prewarm(1, launcher=prewarm)
+    assert prewarm.started.wait(5)
+    thread, result = acquire_in_thread(pool)
+    thread.join(0.3)
+    assert thread.is_alive()  # waiting for the prewarm, not launching a second Chrome
+
+    gate.set()
+    thread.join(5)
+    assert result["slot"].driver is prewarm.drivers[0]
+    assert fallback.drivers == []
+    assert pool._idle == []
+
+
+def test_failed_prewarm_releases_waiters_to_a_free_slot():
+    gate = threading.Event()
+    prewarm = Launcher(gate=gate, fail=True)
+    fallback = Launcher()
+    pool = browser_pool.DriverPool(fallback, max_drivers=2, max_idle=1)
+
+    pool.prewarm(1, launcher=prewarm)
+    assert prewarm.started.wait(5)
+    thread, result = acquire_in_thread(pool)
+    thread.join(0.3)
+    assert thread.is_alive()
+
+    gate.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert result["slot"].driver is fallback.drivers[0]
+
+
+def test_driver_is_discarded_after_recycle_after_checkouts():
+    launcher = Launcher()
+    pool = browser_pool.DriverPool(launcher, max_drivers=1, max_idle=1, recycle_after=2)
+
+    first = pool.acquire()
+    driver = first.driver
+    pool.release(first)
+    second = pool.acquire()
+    assert second.driver is driver  # reused while under the limit
+    pool.release(second)
+
+    assert driver.quit_called
+    assert pool._idle == []
+    third = pool.acquire()
+    assert third.driver is not driver
+    assert len(launcher.drivers) == 2
@@ -0,0 +1,100 @@
+import atexit
+import json
+
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    students = str(tmp_path / "students.json")
+    invitations = str(tmp_path / "invitations.json")
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(storage, "STUDENTS_FILE", students)
+    monkeypatch.setattr(storage, "INVITATIONS_FILE", invitations)
+    monkeypatch.setattr(storage, "LOG_FILES", {
+        students: str(tmp_path / "students.log"),
+        invitations: str(tmp_path / "invitations.log"),
+    })
+    monkeypatch.delenv("STORAGE_KEY", raising=False)
+    return tmp_path
+
+
+def open_storage():
+    s = storage.Storage()
+    atexit.unregister(s.compact)  # the test decides when (and whether) to compact
+    return s
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_changes_are_appended_and_replayed(data_dir):
+    s = open_storage()
+    s.add_student(1, "user", "pw", "CODE0001")
+    for mode in ("manual", "automatic", "manual"):
+        s.update_student(1, mode=mode)
+    s.flush()
+
+    lines = read(data_dir / "students.log").splitlines()
+    assert len(lines) == 1  # updates within one flush coalesce into a single upsert
+    assert json.loads(read(data_dir / "students.json")) == {}
+
+    reopened = open_storage()
+    assert reopened.get_student(1)["mode"] == "manual"
+
+
+def test_torn_tail_line_is_skipped(data_dir):
+    s = open_storage()
+    s.add_student(1, "user", "pw", "CODE0001")
+    s.flush()
+    with open(data_dir / "students.log", "a", encoding="utf-8") as f:
+        f.write('{"op": "upsert", "id": "2", "da')
+
+    reopened = open_storage()
+    assert reopened.get_student(1)["username"] == "user"
+    assert reopened.get_student(2) is None
+
+    # Startup folded the log away, so new appends do not land after the torn line.
+    assert read(data_dir / "students.log") == ""
+    reopened.update_student(1, mode="manual")
+    reopened.flush()
+    assert open_storage().get_student(1)["mode"] == "manual"
+
+
+def test_long_log_is_compacted_into_snapshot(data_dir):
+    s = open_storage()
+    s.add_student(1, "user", "pw", "CODE0001")
+    s.flush()
+    for i in range(storage.COMPACT_MIN_LINES + 1):
+        s.update_student(1, mode=str(i))
+        s.flush()
+
+    assert s._log_lines[storage.STUDENTS_FILE] < storage.COMPACT_MIN_LINES
+    snapshot = json.loads(read(data_dir / "students.json"))
+    assert snapshot["1"]["username"] == "user"
+    assert open_storage().get_student(1)["mode"] == str(storage.COMPACT_MIN_LINES)
+
+
+def test_plaintext_passwords_are_encrypted_once_a_key_is_set(data_dir, monkeypatch):
+    pytest.importorskip("cryptography")
+    s = open_storage()
+    s.add_student(1, "user", "secret-pw", "CODE0001")
+    s.compact()
+    assert "secret-pw" in read(data_dir / "students.json")
+
+    monkeypatch.setenv("STORAGE_KEY", "passphrase")
+    migrated = open_storage()
+    assert migrated.get_student(1)["password"] == "secret-pw"
+    on_disk = json.loads(read(data_dir / "students.json"))["1"]
+    assert "password" not in on_disk
+    assert "secret-pw" not in on_disk["password_encrypted"]
+
+    assert open_storage().get_student(1)["password"] == "secret-pw"
+
+    monkeypatch.setenv("STORAGE_KEY", "another passphrase")
+    with pytest.raises(RuntimeError):
+        open_storage()